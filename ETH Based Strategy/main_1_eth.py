@@ -11,6 +11,102 @@ from pykalman import KalmanFilter
 import warnings 
 warnings.filterwarnings("ignore")
 
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; the kernels below then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Same options as JIT_OPTIONS in "Enhanced Technical strategy/_njit.py", and
+# rolling_mean_std below uses the sliding Welford update of indicators.rolling_mean_std
+# there. Each strategy folder runs as a standalone script, so keep the two in step by hand.
+JIT_OPTIONS = dict(
+    cache=True,
+    fastmath={"nsz", "arcp", "contract", "afn", "reassoc"},
+    boundscheck=False,
+)
+
+@njit(**JIT_OPTIONS)
+def rolling_mean_std(x, window, ddof=1):
+    """
+    Rolling mean and standard deviation in a single pass (sliding Welford update).
+    Matches pandas' rolling(window).mean() / .std(ddof): a NaN in the input resets the
+    window, so output is NaN until `window` consecutive finite values are seen again.
+    """
+    n = x.shape[0]
+    out_mean = np.full(n, np.nan)
+    out_std = np.full(n, np.nan)
+    count = 0 # Consecutive finite values in the current run, capped at `window`
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        x_new = x[i]
+        if not np.isfinite(x_new):
+            count = 0
+            mean = 0.0
+            m2 = 0.0
+            continue
+        if count < window:
+            count += 1
+            delta = x_new - mean
+            mean += delta / count
+            m2 += delta * (x_new - mean)
+        else:
+            x_old = x[i - window]
+            old_mean = mean
+            mean += (x_new - x_old) / window
+            m2 += (x_new - x_old) * (x_new - mean + x_old - old_mean)
+        if count == window:
+            out_mean[i] = mean
+            out_std[i] = np.sqrt(max(m2 / (window - ddof), 0.0))
+    return out_mean, out_std
+
+@njit(**JIT_OPTIONS)
+def rolling_rsi(close, window):
+    """
+    RSI from simple rolling means of gains and losses, in one O(n) pass.
+    Matches the previous pandas version (the first bar counts as a zero change).
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    gain = np.zeros(n)
+    loss = np.zeros(n)
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            gain[i] = d
+        elif d < 0:
+            loss[i] = -d
+
+    sum_gain = 0.0
+    sum_loss = 0.0
+    n_gain = 0  # Non-zero counts keep all-flat windows exactly at zero despite float drift
+    n_loss = 0
+    for i in range(n):
+        sum_gain += gain[i]
+        sum_loss += loss[i]
+        n_gain += gain[i] > 0
+        n_loss += loss[i] > 0
+        if i >= window:
+            sum_gain -= gain[i - window]
+            sum_loss -= loss[i - window]
+            n_gain -= gain[i - window] > 0
+            n_loss -= loss[i - window] > 0
+        if n_gain == 0:
+            sum_gain = 0.0
+        if n_loss == 0:
+            sum_loss = 0.0
+        if i < window - 1:
+            continue
+        if sum_loss > 0:
+            out[i] = 100 - (100 / (1 + sum_gain / sum_loss))
+        elif sum_gain > 0:
+            out[i] = 100.0
+    return out
+
 def process_data(data):
     """
     Processes and calculates various indicators for BTC and ETH data.
@@ -59,13 +155,7 @@ def process_data(data):
             Calculate RSI for the given asset and add it to the DataFrame.
             """
             column = f'{asset}_close'
-            delta = cls.data[column].diff()
-            gain = np.where(delta > 0, delta, 0)
-            loss = np.where(delta < 0, -delta, 0)
-            avg_gain = pd.Series(gain).rolling(window=window).mean()
-            avg_loss = pd.Series(loss).rolling(window=window).mean()
-            rs = avg_gain / avg_loss
-            cls.data[f'{asset}_rsi'] = 100 - (100 / (1 + rs))
+            cls.data[f'{asset}_rsi'] = rolling_rsi(cls.data[column].to_numpy(dtype=np.float64), window)
 
         # Function: Calculate ATR
         @classmethod
@@ -135,8 +225,7 @@ def process_data(data):
             Calculate Bollinger Bands for the given asset and add them to the DataFrame.
             """
             column = f'{asset}_close'
-            middle = cls.data[column].rolling(window=window).mean()
-            std = cls.data[column].rolling(window=window).std()
+            middle, std = rolling_mean_std(cls.data[column].to_numpy(dtype=np.float64), window)
             cls.data[f'{asset}_bollinger_middle'] = middle
             cls.data[f'{asset}_bollinger_upper'] = middle + (std * num_std)
             cls.data[f'{asset}_bollinger_lower'] = middle - (std * num_std)
@@ -273,9 +362,28 @@ def strat(data):
     - final_data: DataFrame with generated signals and trade types.
     """
 
-    # Initialize signals and trade_type column
-    data['signals'] = 0
-    data['trade_type'] = " "
+    # Initialize signals and trade_type (written back as columns after the loop)
+    n = len(data)
+    signals = np.zeros(n, dtype=np.int64)
+    trade_type = np.full(n, " ", dtype=object)
+
+    # Pull every column used in the loop out once as a NumPy array
+    eth_close = data['eth_close'].to_numpy()
+    eth_low = data['eth_low'].to_numpy()
+    eth_rsi = data['eth_rsi'].to_numpy()
+    eth_hurst = data['eth_hurst'].to_numpy()
+    eth_supertrend_direction = data['eth_supertrend_direction'].to_numpy()
+    btc_open = data['btc_open'].to_numpy()
+    btc_close = data['btc_close'].to_numpy()
+    btc_atr = data['btc_atr'].to_numpy()
+    btc_rsi = data['btc_rsi'].to_numpy()
+    btc_bollinger_middle = data['btc_bollinger_middle'].to_numpy()
+    btc_bollinger_lower = data['btc_bollinger_lower'].to_numpy()
+    btc_eth_correlation = data['btc_eth_correlation'].to_numpy()
+    btc_bullish = (data['btc_regime'] == 'bullish').to_numpy()
+    btc_bearish = (data['btc_regime'] == 'bearish').to_numpy()
+    # Whole seconds since the first bar, so time differences are exact integer arithmetic
+    seconds = (data['datetime'] - data['datetime'].min()).dt.total_seconds().to_numpy().astype(np.int64)
 
     # Helper function to close positions
     def close_position(stoploss=False):
@@ -288,10 +396,10 @@ def strat(data):
         nonlocal current_position, entry_price, entry_date, highest_since_entry, lowest_since_entry, last_trailing_stop_time
 
         if current_position == 1:
-            data.at[i, 'signals'] = -1
+            signals[i] = -1
         elif current_position == -1:
-            data.at[i, 'signals'] = 1
-        data.at[i, 'trade_type'] = 'close'
+            signals[i] = 1
+        trade_type[i] = 'close'
         current_position = 0
         entry_price = None  # Reset entry price
         entry_date = None  # Reset entry date
@@ -325,20 +433,19 @@ def strat(data):
 
 
     # Main loop to process data hour by hour
-    for i in range(len(data)):
-        current_price = data['eth_close'].iloc[i]
-        current_time = data['datetime'].iloc[i]
-        high_price = data['eth_high'].iloc[i]
-        low_price = data['eth_low'].iloc[i]
+    for i in range(n):
+        current_price = eth_close[i]
+        current_time = seconds[i]
+        low_price = eth_low[i]
 
         # Halt trading during cooldown period
         if last_trailing_stop_time is not None:
-            time_since_trailing_stop = (current_time - last_trailing_stop_time).total_seconds() / 3600
-            if time_since_trailing_stop < COOLDOWN_PERIOD:
+            time_since_trailing_stop = current_time - last_trailing_stop_time
+            if time_since_trailing_stop < COOLDOWN_PERIOD * 3600:
                 continue
         
         # Ensure open positions are closed at the end of the data
-        if i == len(data) - 1 and current_position != 0:
+        if i == n - 1 and current_position != 0:
             close_position()
             continue
         
@@ -346,7 +453,7 @@ def strat(data):
         if current_position == 1:
             highest_since_entry = max(highest_since_entry or current_price, current_price)
             trailing_stop_price = highest_since_entry * (1 - TRAILING_STOPLOSS_PCT)
-            lowest_24hr = data.loc[max(0, i-24):i, 'eth_low'].min()
+            lowest_24hr = np.nanmin(eth_low[max(0, i-24):i+1])
             stop_price = (lowest_24hr + trailing_stop_price) / 2 if lowest_24hr < trailing_stop_price else lowest_24hr
                 
             if current_price <= stop_price:
@@ -364,70 +471,72 @@ def strat(data):
         
         # Check max holding period and volatility-based stop-loss
         if current_position != 0 and entry_price is not None:
-            time_since_entry = (current_time - entry_date).total_seconds() / 3600
-            if time_since_entry >= MAX_HOLDING_PERIOD: # Exceeded max holding period
+            time_since_entry = current_time - entry_date
+            if time_since_entry >= MAX_HOLDING_PERIOD * 3600: # Exceeded max holding period
                 close_position(stoploss=True)
                 continue
-            if data['btc_atr'][i] > BTC_ATR_THRESHOLD_STOP * data['btc_open'][i]: # BTC indicating high-volatility(>0.025)
+            if btc_atr[i] > BTC_ATR_THRESHOLD_STOP * btc_open[i]: # BTC indicating high-volatility(>0.025)
                 close_position(stoploss=True)
                 continue
 
         # Contained ATR(<0.01), trend-following Hurst, and highly correlated(BTC-ETH) trading region conditions
-        if (data['btc_atr'][i] < BTC_ATR_THRESHOLD_TRADE * data['btc_open'][i] and 
-            data['btc_eth_correlation'][i] > CORRELATION_THRESHOLD and 
-            data['eth_hurst'].iloc[i] > HURST_THRESHOLD):  
+        if (btc_atr[i] < BTC_ATR_THRESHOLD_TRADE * btc_open[i] and 
+            btc_eth_correlation[i] > CORRELATION_THRESHOLD and 
+            eth_hurst[i] > HURST_THRESHOLD):  
 
             if current_position == 0:
                 # LONG ENTRY CONDITIONS
                 if (
-                    data['btc_rsi'][i] > RSI_THRESHOLD_HIGH and     # 70 
-                    data['btc_regime'][i] == 'bullish' and
-                    data['btc_close'][i] > data['btc_bollinger_middle'][i] and
-                    data['eth_supertrend_direction'][i] == 1):
+                    btc_rsi[i] > RSI_THRESHOLD_HIGH and     # 70 
+                    btc_bullish[i] and
+                    btc_close[i] > btc_bollinger_middle[i] and
+                    eth_supertrend_direction[i] == 1):
 
-                    data.at[i, 'signals'] = 1
-                    data.at[i, 'trade_type'] = 'long'
+                    signals[i] = 1
+                    trade_type[i] = 'long'
                     current_position = 1
                     entry_price = current_price
-                    entry_date = data['datetime'].iloc[i]
+                    entry_date = current_time
                     highest_since_entry = current_price
                     
                 # SHORT ENTRY CONDITIONS
                 if (
-                    data['btc_rsi'][i] < RSI_THRESHOLD_LOW and     # 30
-                    data['btc_regime'][i] == 'bearish' and
-                    data['btc_close'][i] < data['btc_bollinger_lower'][i] and
-                    data['eth_supertrend_direction'][i] == -1):  
+                    btc_rsi[i] < RSI_THRESHOLD_LOW and     # 30
+                    btc_bearish[i] and
+                    btc_close[i] < btc_bollinger_lower[i] and
+                    eth_supertrend_direction[i] == -1):  
 
-                    data.at[i, 'signals'] = -1
-                    data.at[i, 'trade_type'] = 'short'
+                    signals[i] = -1
+                    trade_type[i] = 'short'
                     current_position = -1
                     entry_price = current_price
-                    entry_date = data['datetime'].iloc[i]
+                    entry_date = current_time
                     lowest_since_entry = current_price
                                   
             # LONG EXIT CONDITIONS
             elif current_position == 1 and (   
-                data['btc_rsi'][i] < RSI_THRESHOLD_LOW and     # 30
-                data['eth_rsi'][i] < data['eth_rsi'][i-1] and
-                data['btc_regime'][i] == 'bearish' and
-                data['btc_close'][i] < data['btc_bollinger_lower'][i] and
-                data['eth_supertrend_direction'][i] == -1):  
+                btc_rsi[i] < RSI_THRESHOLD_LOW and     # 30
+                eth_rsi[i] < eth_rsi[i-1] and
+                btc_bearish[i] and
+                btc_close[i] < btc_bollinger_lower[i] and
+                eth_supertrend_direction[i] == -1):  
                                 
                 close_position(stoploss=False) # Square off long position
 
             # SHORT EXIT CONDITIONS
             elif current_position == -1 and (
-                data['btc_rsi'][i] > RSI_THRESHOLD_HIGH and     # 70
-                data['btc_rsi'][i-1] > RSI_THRESHOLD_HIGH and   # 70
-                data['eth_rsi'][i] > data['eth_rsi'][i-1] and
-                data['btc_regime'][i] == 'bullish' and
-                data['btc_close'][i] > data['btc_bollinger_middle'][i] and
-                data['eth_supertrend_direction'][i] == 1):
+                btc_rsi[i] > RSI_THRESHOLD_HIGH and     # 70
+                btc_rsi[i-1] > RSI_THRESHOLD_HIGH and   # 70
+                eth_rsi[i] > eth_rsi[i-1] and
+                btc_bullish[i] and
+                btc_close[i] > btc_bollinger_middle[i] and
+                eth_supertrend_direction[i] == 1):
                     
                 close_position(stoploss=False) # Square off short position
 
     # Finalize the output DataFrame
+    data['signals'] = signals
+    data['trade_type'] = trade_type
     data.columns = data.columns.str.lower().str.strip()
     
     data = data.rename(columns={
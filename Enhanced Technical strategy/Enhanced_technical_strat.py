@@ -1,7 +1,16 @@
+import math
+from dataclasses import dataclass
+from typing import Iterable, Literal, Optional
 import pandas as pd
 import numpy as np
-from enum import Enum
-import pandas_ta as pta
+from enum import Enum, IntEnum
+
+from _njit import njit, JIT_OPTIONS
+import indicators as ind
+
+# Set to False to compute indicators with pandas_ta instead of the kernels in indicators.py
+# (pandas_ta is then imported when a Strategy is created)
+USE_FAST_INDICATORS = True
 
 class TradeType(Enum):
     LONG = "LONG"
@@ -11,249 +20,441 @@ class TradeType(Enum):
     CLOSE = "CLOSE"
     HOLD = "HOLD"
 
+class TradeCode(IntEnum):
+    """Integer codes for TradeType used inside the compiled loop (Numba can't handle str)."""
+    HOLD = 0
+    LONG = 1
+    SHORT = 2
+    REVERSE_LONG = 3
+    REVERSE_SHORT = 4
+    CLOSE = 5
+
+# Module-level aliases: a plain global load in the loop, a compile-time constant under Numba
+HOLD, LONG, SHORT, REVERSE_LONG, REVERSE_SHORT, CLOSE = TradeCode
+# Categories of the output 'trade_type' column, indexed by trade code
+TRADE_CATEGORIES = [TradeType[code.name].value for code in TradeCode]
+
+
+def _trade_columns(n, outputs=None):
+    """
+    Output trade columns from _simulate's (trade_code, SL, TP, TSL), or HOLD/NaN defaults.
+    'trade_type' is categorical over TRADE_CATEGORIES (1 byte per bar).
+    """
+    if outputs is None:
+        outputs = (np.zeros(n, dtype=np.int8), np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan))
+    trade_code, SL_arr, TP_arr, TSL_arr = outputs
+    return {
+        'trade_type': pd.Categorical.from_codes(trade_code, categories=TRADE_CATEGORIES),
+        'TP': TP_arr,
+        'SL': SL_arr,
+        'TSL': TSL_arr,
+    }
+
+
+@njit(**JIT_OPTIONS)
+def _strategy_loop(close, high, low, valid,
+                   long_sig, short_sig, long_exit, short_exit, first_i,
+                   d_sl, d_tp, allow_reversals, trade_code):
+    """
+    Bar-by-bar state machine over raw NumPy arrays.
+    valid[i] is False where any essential indicator is NaN (see Strategy._compute_indicators).
+    Entry signals and trend-weakness exits are precomputed boolean arrays (see _signals),
+    and d_sl / d_tp are the per-bar ATR stop and target distances.
+
+    Only transitions are written: trade codes (see TRADE_CATEGORIES) go into the
+    preallocated trade_code array, and every position is returned as a segment
+    (start, stop, closed, direction, SL, TP). The per-bar SL/TP/TSL columns are
+    expanded from the segments afterwards (see _expand_segments).
+    """
+    n = close.shape[0]
+    seg_start = np.empty(n, dtype=np.int64)
+    seg_stop = np.empty(n, dtype=np.int64)   # Exclusive
+    seg_closed = np.zeros(n, dtype=np.bool_) # Ended by CLOSE on bar stop - 1 (vs. reversal / end of data)
+    seg_dir = np.empty(n, dtype=np.int8)
+    seg_sl = np.empty(n)
+    seg_tp = np.empty(n)
+    k = 0 # Number of segments opened so far
+
+    position = np.int8(0) # 0 = flat, 1 = long, -1 = short
+    tsl = np.nan
+    sl = np.nan
+    tp = np.nan
+
+    for i in range(first_i, n):
+        # Skip bars where an essential indicator is NaN, carrying the current state
+        if not valid[i]:
+            continue
+
+        current_price = close[i]
+        current_high = high[i]
+        current_low = low[i]
+
+        exit_triggered = False
+
+        # --- Exit Logic ---
+        if position == 1:
+            # TSL update: Check TSL before SL/TP as it might have moved closer
+            if current_low <= tsl:
+                exit_triggered = True
+            elif current_low <= sl: # Check Initial SL
+                exit_triggered = True
+            elif current_high >= tp: # Check TP
+                exit_triggered = True
+            # Simplified Trend Weakness Exit (EMA cross, optionally VWAP), more reliant on TSL/SL
+            elif long_exit[i]:
+                exit_triggered = True
+
+            # Update TSL if position is still open
+            if not exit_triggered:
+                potential_tsl = current_price - d_sl[i]
+                # Check if tsl is NaN (first bar after entry) or if potential_tsl is higher
+                if math.isnan(tsl) or potential_tsl > tsl:
+                    tsl = potential_tsl # Move TSL up
+
+        elif position == -1:
+            if current_high >= tsl:
+                exit_triggered = True
+            elif current_high >= sl: # Check Initial SL
+                exit_triggered = True
+            elif current_low <= tp: # Check TP
+                exit_triggered = True
+            # Simplified Trend Weakness Exit
+            elif short_exit[i]:
+                exit_triggered = True
+
+            if not exit_triggered:
+                potential_tsl = current_price + d_sl[i]
+                if math.isnan(tsl) or potential_tsl < tsl:
+                    tsl = potential_tsl # Move TSL down
+
+        # --- Process Exit ---
+        if exit_triggered:
+            trade_code[i] = CLOSE
+            position = 0
+            seg_stop[k - 1] = i + 1 # Exit bar still shows the closed trade's stops
+            seg_closed[k - 1] = True
+            sl, tp, tsl = np.nan, np.nan, np.nan # Reset internal state
+            continue
+
+        # --- Entry / Reversal Logic ---
+        long_signal = long_sig[i]
+        short_signal = short_sig[i]
+
+        # --- Execute Trades ---
+        # trade_code already defaults to HOLD if no action
+        previous_position = position
+        if position == 0: # Only new entries if flat
+            if long_signal:
+                trade_code[i] = LONG
+                position = 1
+                sl = current_price - d_sl[i]
+                # TSL starts at SL level, will be updated on next bars if price moves favorably
+                tsl = sl
+                tp = current_price + d_tp[i]
+            elif short_signal:
+                trade_code[i] = SHORT
+                position = -1
+                sl = current_price + d_sl[i]
+                tsl = sl
+                tp = current_price - d_tp[i]
+
+        elif allow_reversals: # Handle reversals only if allowed
+            if position == -1 and long_signal:
+                trade_code[i] = REVERSE_LONG
+                position = 1
+                sl = current_price - d_sl[i]
+                tsl = sl
+                tp = current_price + d_tp[i]
+            elif position == 1 and short_signal:
+                trade_code[i] = REVERSE_SHORT
+                position = -1
+                sl = current_price + d_sl[i]
+                tsl = sl
+                tp = current_price - d_tp[i]
+
+        # --- Record a new position segment ---
+        if position != previous_position:
+            if previous_position != 0: # Reversal ends the previous segment
+                seg_stop[k - 1] = i
+            seg_start[k] = i
+            seg_stop[k] = n
+            seg_dir[k] = position
+            seg_sl[k] = sl
+            seg_tp[k] = tp
+            k += 1
+
+    return seg_start[:k], seg_stop[:k], seg_closed[:k], seg_dir[:k], seg_sl[:k], seg_tp[:k]
+
+
+def _expand_segments(segments, close, d_sl, valid):
+    """
+    Per-bar SL, TP and TSL columns from the position segments of _strategy_loop.
+    SL/TP are constant over a segment. TSL starts at SL and ratchets with the running
+    max (long) / min (short) of close -/+ d_sl over the bars where the loop updated it,
+    i.e. valid bars after entry, excluding the exit bar.
+    """
+    n = close.shape[0]
+    SL_arr = np.full(n, np.nan)
+    TP_arr = np.full(n, np.nan)
+    TSL_arr = np.full(n, np.nan)
+    for start, stop, closed, direction, sl, tp in zip(*segments):
+        SL_arr[start:stop] = sl
+        TP_arr[start:stop] = tp
+        if direction == 1:
+            candidates = np.where(valid[start:stop], close[start:stop] - d_sl[start:stop], -np.inf)
+            candidates[0] = sl
+            if closed:
+                candidates[-1] = -np.inf
+            np.maximum.accumulate(candidates, out=TSL_arr[start:stop])
+        else:
+            candidates = np.where(valid[start:stop], close[start:stop] + d_sl[start:stop], np.inf)
+            candidates[0] = sl
+            if closed:
+                candidates[-1] = np.inf
+            np.minimum.accumulate(candidates, out=TSL_arr[start:stop])
+    return SL_arr, TP_arr, TSL_arr
+
+
+def _signals(close, ema50, ema200, vwap, bb_width, adx, plus_di, minus_di, rsi,
+             min_bb_width, adx_threshold, rsi_long_entry, rsi_short_entry, exit_mode):
+    """
+    Vectorized entry signals and trend-weakness exits. They only depend on the bar's own
+    indicator values, so they are computed once for all bars instead of inside the loop.
+    """
+    ema_bull = ema50 > ema200
+    ema_bear = ema50 < ema200
+    common = (bb_width > min_bb_width) & (adx > adx_threshold)
+    long_sig = np.logical_and.reduce([
+        ema_bull,
+        close > vwap, # Consider adding a small buffer? e.g., close > vwap * 1.001
+        common,
+        plus_di > minus_di,
+        rsi >= rsi_long_entry,
+    ])
+    short_sig = np.logical_and.reduce([
+        ema_bear,
+        close < vwap, # Consider buffer? e.g., close < vwap * 0.999
+        common,
+        minus_di > plus_di,
+        rsi <= rsi_short_entry,
+    ])
+
+    if exit_mode == 'ema_cross':
+        long_exit, short_exit = ema_bear, ema_bull
+    elif exit_mode == 'ema_or_vwap':
+        long_exit = ema_bear | (close < vwap)
+        short_exit = ema_bull | (close > vwap)
+    else:
+        raise ValueError(f"Unknown exit_mode: '{exit_mode}'")
+    return long_sig, short_sig, long_exit, short_exit
+
+
+@dataclass
+class StrategyParams:
+    atr_mult_sl: float = 2.5     # Widen SL (previously 1.5)
+    atr_mult_tp: float = 3.0     # Aim for slightly higher Reward (previously 2.5)
+    min_bb_width: float = 0.015  # Slightly higher min width? (optional)
+    adx_threshold: float = 28    # Stricter ADX (previously 25)
+    rsi_long_entry: float = 55   # Stricter RSI for long (previously 50)
+    rsi_short_entry: float = 45  # Stricter RSI for short (previously 50)
+    # adx_trend_weak_level = adx_threshold - 5 # Keep or remove? Let's simplify exit first
+    allow_reversals: bool = False  # Set to True to allow REVERSE_LONG/SHORT, False to force CLOSE first
+    # Trend weakness exit: EMA-50/200 cross only, or also when price crosses back through VWAP
+    exit_mode: Literal['ema_cross', 'ema_or_vwap'] = 'ema_cross'
+
+
+def _simulate(params, arrays):
+    """
+    Run the state machine for one parameter set over precomputed indicator arrays
+    (see Strategy._compute_indicators). Returns (trade_code, SL, TP, TSL).
+    """
+    long_sig, short_sig, long_exit, short_exit = _signals(
+        arrays['close'], arrays['ema_50'], arrays['ema_200'], arrays['vwap'], arrays['bb_width'],
+        arrays['adx'], arrays['plus_di'], arrays['minus_di'], arrays['rsi'],
+        params.min_bb_width, params.adx_threshold, params.rsi_long_entry, params.rsi_short_entry,
+        params.exit_mode,
+    )
+
+    # ATR stop/target distances; avoid zero stops if ATR is momentarily 0
+    atr_safe = np.where(arrays['atr'] == 0, 0.0001, arrays['atr'])
+    d_sl = atr_safe * params.atr_mult_sl
+    d_tp = atr_safe * params.atr_mult_tp
+
+    trade_code = np.zeros(arrays['close'].shape[0], dtype=np.int8) # HOLD
+
+    # --- Strategy Loop (compiled, see _strategy_loop) ---
+    segments = _strategy_loop(
+        arrays['close'], arrays['high'], arrays['low'], arrays['valid'],
+        long_sig, short_sig, long_exit, short_exit, arrays['first_i'],
+        d_sl, d_tp, params.allow_reversals, trade_code,
+    )
+    SL_arr, TP_arr, TSL_arr = _expand_segments(segments, arrays['close'], d_sl, arrays['valid'])
+    return trade_code, SL_arr, TP_arr, TSL_arr
+
+
+_warmed_up = False
+
+def _warmup():
+    """
+    Compile (or load from Numba's on-disk cache) every kernel on a tiny dummy input,
+    with the same argument types as real calls, so the first backtest doesn't pay for it.
+    """
+    global _warmed_up
+    if _warmed_up:
+        return
+    x = np.linspace(1.0, 2.0, 64)
+    # Price columns come out of pandas read-only under Copy-on-Write, which Numba compiles separately
+    x_readonly = x.copy()
+    x_readonly.setflags(write=False)
+    mask = np.ones(64, dtype=bool)
+    for prices in (x, x_readonly):
+        ind.ema_pair(prices, 8, 16)
+        ind.rolling_mean_std(prices, 8)
+        ind.rsi_wilder(prices, 8)
+        ind.atr_wilder(prices, prices, prices, 8)
+        ind.adx_wilder(prices, prices, prices, 8)
+        ind.vwap_running(prices, prices)
+        _strategy_loop(prices, prices, prices, mask, mask, mask, mask, mask, 0, x, x, False,
+                       np.zeros(64, dtype=np.int8))
+    _warmed_up = True
+
+
 class Strategy:
-    def run(self, data: pd.DataFrame) -> pd.DataFrame:
+    def __init__(self, use_pandas_ta: Optional[bool] = None):
+        # Defaults to the module-level USE_FAST_INDICATORS switch
+        self.use_pandas_ta = (not USE_FAST_INDICATORS) if use_pandas_ta is None else use_pandas_ta
+        if self.use_pandas_ta:
+            # pandas_ta is slow to import, so it is only loaded when used. Importing it here
+            # makes a missing install raise instead of being swallowed by the indicator
+            # error handling.
+            import pandas_ta  # noqa: F401  (registers DataFrame.ta)
+        _warmup()
+
+    def run(self, data: pd.DataFrame, params: Optional[StrategyParams] = None) -> pd.DataFrame:
         """
         Execute the refined strategy aiming for better profitability.
         Changes: Wider SL, Stricter Entry (ADX/RSI), Simplified Exit, Optional No-Reversal.
         """
+        if params is None:
+            params = StrategyParams()
+
+        df, indicators, arrays = self._compute_indicators(data)
+        outputs = _simulate(params, arrays) if arrays is not None else None
+        return df.assign(**indicators, **_trade_columns(len(df), outputs))
+
+    def run_grid(self, data: pd.DataFrame, grid: Iterable[StrategyParams], n_jobs: int = -1) -> list[pd.DataFrame]:
+        """
+        Backtest every StrategyParams in `grid` over the same data.
+        Indicators are computed once; the per-parameter simulations run in parallel with joblib.
+        Returns one DataFrame per parameter set, in the order of `grid`.
+        """
+        from joblib import Parallel, delayed
+
+        grid = list(grid)
+        df, indicators, arrays = self._compute_indicators(data)
+        if arrays is None:
+            results = [None] * len(grid)
+        else:
+            results = Parallel(n_jobs=n_jobs, backend='loky')(
+                delayed(_simulate)(params, arrays) for params in grid
+            )
+        return [df.assign(**indicators, **_trade_columns(len(df), outputs)) for outputs in results]
+
+    def _compute_indicators(self, data: pd.DataFrame):
+        """
+        Compute the indicators without copying or modifying `data`.
+        Returns (df, indicators, arrays): the cleaned input frame, the indicator columns
+        as NumPy arrays, and the inputs of _simulate (None if there is nothing to simulate).
+        """
+        indicators = {}
         if data.empty:
-            data['trade_type'] = TradeType.HOLD.value
-            data['TP'] = np.nan
-            data['SL'] = np.nan
-            data['TSL'] = np.nan
-            return data
+            return data, indicators, None
 
-        df = data.copy()
         # Expecting columns: datetime, open, high, low, close, volume
-        # Standardize known potential variations
-        df.rename(columns={'Datetime': 'datetime', 'Open': 'open', 'High': 'high',
-                           'Low': 'low', 'Close': 'close', 'Volume': 'volume'}, inplace=True)
-        df.columns = [col.lower() for col in df.columns] # Ensure lowercase
+        # Standardize known potential variations (Datetime, Open, ...) to lowercase
+        df = data
+        if any(col != col.lower() for col in df.columns):
+            df = df.rename(columns=str.lower)
 
         required_cols = ['open', 'high', 'low', 'close', 'volume']
         for col in required_cols:
             if col not in df.columns:
                 raise KeyError(f"Missing required column: '{col}'")
 
-        df.dropna(subset=required_cols, inplace=True)
+        complete = df[required_cols].notna().all(axis=1).to_numpy()
+        if not complete.all():
+            df = df[complete]
         if len(df) < 200:
              print(f"Warning: Data length ({len(df)}) after NaN drop is less than 200. Results may be unreliable.")
-             df['trade_type'] = TradeType.HOLD.value
-             df['TP'] = np.nan
-             df['SL'] = np.nan
-             df['TSL'] = np.nan
              # Don't calculate indicators if data is too short
-             return df
+             return df, indicators, None
 
-        # === Indicators using pandas_ta ===
+        close = df['close'].to_numpy(dtype=np.float64)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        volume = df['volume'].to_numpy(dtype=np.float64)
+
+        # === Indicators ===
         try:
-            df.ta.ema(length=50, append=True, col_names=('ema_50',))
-            df.ta.ema(length=200, append=True, col_names=('ema_200',))
-            bbands_df = df.ta.bbands(length=20, std=2)
-            # Assign directly using .loc to avoid potential SettingWithCopyWarning later
-            df.loc[:, 'bb_lower'] = bbands_df['BBL_20_2.0']
-            df.loc[:, 'bb_mid'] = bbands_df['BBM_20_2.0']
-            df.loc[:, 'bb_upper'] = bbands_df['BBU_20_2.0']
-            df.loc[:, 'bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_mid'].replace(0, np.nan)
-
-            df.loc[:, 'cum_vol_price'] = (df['close'] * df['volume']).cumsum()
-            df.loc[:, 'cum_vol'] = df['volume'].cumsum()
-            df.loc[:, 'vwap'] = df['cum_vol_price'] / df['cum_vol'].replace(0, np.nan)
-            df['vwap'].ffill(inplace=True) # Handle potential initial NaNs if volume starts at 0
-
-            df.ta.rsi(length=14, append=True, col_names=('rsi',))
-            df.ta.atr(length=14, append=True, col_names=('atr',))
-            adx_df = df.ta.adx(length=14)
-            df.loc[:, 'adx'] = adx_df['ADX_14']
-            df.loc[:, 'plus_di'] = adx_df['DMP_14']
-            df.loc[:, 'minus_di'] = adx_df['DMN_14']
+            if not self.use_pandas_ta:
+                indicators['ema_50'], indicators['ema_200'] = ind.ema_pair(close, 50, 200)
+                bb_mid, bb_std = ind.rolling_mean_std(close, 20)
+                indicators['bb_lower'] = bb_mid - 2 * bb_std
+                indicators['bb_mid'] = bb_mid
+                indicators['bb_upper'] = bb_mid + 2 * bb_std
+            else:
+                indicators['ema_50'] = df.ta.ema(length=50).to_numpy(dtype=np.float64)
+                indicators['ema_200'] = df.ta.ema(length=200).to_numpy(dtype=np.float64)
+                bbands_df = df.ta.bbands(length=20, std=2)
+                indicators['bb_lower'] = bbands_df['BBL_20_2.0'].to_numpy(dtype=np.float64)
+                indicators['bb_mid'] = bbands_df['BBM_20_2.0'].to_numpy(dtype=np.float64)
+                indicators['bb_upper'] = bbands_df['BBU_20_2.0'].to_numpy(dtype=np.float64)
+            bb_mid = indicators['bb_mid']
+            indicators['bb_width'] = (indicators['bb_upper'] - indicators['bb_lower']) / np.where(bb_mid == 0, np.nan, bb_mid)
+
+            indicators['vwap'] = ind.vwap_running(close, volume)
+
+            if not self.use_pandas_ta:
+                indicators['rsi'] = ind.rsi_wilder(close, 14)
+                indicators['atr'] = ind.atr_wilder(high, low, close, 14)
+                adx, plus_di, minus_di = ind.adx_wilder(high, low, close, 14)
+            else:
+                indicators['rsi'] = df.ta.rsi(length=14).to_numpy(dtype=np.float64)
+                indicators['atr'] = df.ta.atr(length=14).to_numpy(dtype=np.float64)
+                adx_df = df.ta.adx(length=14)
+                adx = adx_df['ADX_14'].to_numpy(dtype=np.float64)
+                plus_di = adx_df['DMP_14'].to_numpy(dtype=np.float64)
+                minus_di = adx_df['DMN_14'].to_numpy(dtype=np.float64)
+            indicators['adx'] = adx
+            indicators['plus_di'] = plus_di
+            indicators['minus_di'] = minus_di
         except Exception as e:
             print(f"Error calculating indicators: {e}")
-            # Return df with available columns if indicators fail
-            df['trade_type'] = TradeType.HOLD.value
-            df['TP'] = np.nan
-            df['SL'] = np.nan
-            df['TSL'] = np.nan
-            return df
-
-        # === Strategy Logic ===
-        df['trade_type'] = TradeType.HOLD.value
-        df['TP'] = np.nan
-        df['SL'] = np.nan
-        df['TSL'] = np.nan
-
-        # --- Parameters ---
-        position = None # None, 'LONG', or 'SHORT'
-        entry_price = np.nan
-        tsl = np.nan
-        sl = np.nan
-        tp = np.nan
-
-        # * Parameter Adjustments *
-        atr_mult_sl = 2.5  # Widen SL (previously 1.5)
-        atr_mult_tp = 3.0  # Aim for slightly higher Reward (previously 2.5)
-        min_bb_width = 0.015 # Slightly higher min width? (optional)
-        adx_threshold = 28   # Stricter ADX (previously 25)
-        rsi_long_entry = 55  # Stricter RSI for long (previously 50)
-        rsi_short_entry = 45 # Stricter RSI for short (previously 50)
-        # adx_trend_weak_level = adx_threshold - 5 # Keep or remove? Let's simplify exit first
-
-        # --- Option: Disable Direct Reversals ---
-        allow_reversals = False # Set to True to allow REVERSE_LONG/SHORT, False to force CLOSE first
-
-        first_valid_index = df.dropna(subset=['ema_200', 'bb_lower', 'rsi', 'atr', 'adx']).index.min()
-
-        if pd.isna(first_valid_index):
+            # Return the indicators that are available if some fail
+            return df, indicators, None
+
+        arrays = {'close': close, 'high': high, 'low': low}
+        # Bars where every essential indicator is available, checked once for all bars
+        valid = np.ones(len(df), dtype=bool)
+        for col in ('ema_50', 'ema_200', 'vwap', 'bb_width', 'adx', 'plus_di', 'minus_di', 'rsi', 'atr'):
+            arrays[col] = indicators[col]
+            valid &= ~np.isnan(indicators[col])
+
+        # The output columns (except ATR, which sets SL/TP levels) are stored as float32 to
+        # halve their size. The signals keep using the float64 values in `arrays`: rounding
+        # e.g. VWAP to float32 would flip `close > vwap` when the two are close.
+        for col in indicators:
+            if col != 'atr':
+                indicators[col] = indicators[col].astype(np.float32)
+
+        if not valid.any():
             print("Warning: No valid starting index after indicator calculation.")
-            return df # Already has default columns
-
-        # --- Strategy Loop ---
-        for i in df.index[df.index >= first_valid_index]:
-            row = df.loc[i]
-            # Check essential indicators for NaN again inside loop just in case
-            essential_indicators = ['ema_50', 'ema_200', 'vwap', 'bb_width', 'adx', 'plus_di', 'minus_di', 'rsi', 'atr']
-            if row[essential_indicators].isnull().any():
-                df.loc[i, 'trade_type'] = TradeType.HOLD.value
-                df.loc[i, 'SL'] = sl
-                df.loc[i, 'TP'] = tp
-                df.loc[i, 'TSL'] = tsl
-                continue
-
-            current_price = row['close']
-            current_high = row['high']
-            current_low = row['low']
-            atr = row['atr']
-            if atr == 0: atr = 0.0001 # Avoid division by zero or zero stops if ATR is momentarily 0
-
-            adx = row['adx']
-            plus_di = row['plus_di']
-            minus_di = row['minus_di']
-            rsi = row['rsi']
-            ema_50 = row['ema_50']
-            ema_200 = row['ema_200']
-            vwap = row['vwap']
-            bb_width = row['bb_width']
-
-            exit_triggered = False
-            exit_type = TradeType.CLOSE.value
-
-            # --- Exit Logic ---
-            if position == 'LONG':
-                 # TSL update: Check TSL before SL/TP as it might have moved closer
-                if current_low <= tsl:
-                    exit_triggered = True
-                elif current_low <= sl: # Check Initial SL
-                    exit_triggered = True
-                elif current_high >= tp: # Check TP
-                    exit_triggered = True
-                # Simplified Trend Weakness Exit: Only use EMA cross, more reliant on TSL/SL
-                elif ema_50 < ema_200:
-                     exit_triggered = True
-
-                # Update TSL if position is still open
-                if not exit_triggered:
-                    potential_tsl = current_price - atr * atr_mult_sl
-                    # Check if tsl is NaN (first bar after entry) or if potential_tsl is higher
-                    if pd.isna(tsl) or potential_tsl > tsl:
-                       tsl = potential_tsl # Move TSL up
-
-            elif position == 'SHORT':
-                if current_high >= tsl:
-                    exit_triggered = True
-                elif current_high >= sl: # Check Initial SL
-                    exit_triggered = True
-                elif current_low <= tp: # Check TP
-                    exit_triggered = True
-                # Simplified Trend Weakness Exit
-                elif ema_50 > ema_200:
-                     exit_triggered = True
-
-                if not exit_triggered:
-                    potential_tsl = current_price + atr * atr_mult_sl
-                    if pd.isna(tsl) or potential_tsl < tsl:
-                        tsl = potential_tsl # Move TSL down
-
-            # --- Process Exit ---
-            if exit_triggered:
-                df.loc[i, 'trade_type'] = exit_type # Set to CLOSE
-                position = None
-                entry_price = np.nan
-                df.loc[i, 'SL'] = sl
-                df.loc[i, 'TP'] = tp
-                df.loc[i, 'TSL'] = tsl # Record the TSL value at exit
-                sl, tp, tsl = np.nan, np.nan, np.nan # Reset internal state
-                continue
-
-            # --- Entry / Reversal Logic ---
-            trade_executed_this_bar = False
-
-            long_signal = (
-                ema_50 > ema_200
-                and current_price > vwap # Consider adding a small buffer? e.g., current_price > vwap * 1.001
-                and bb_width > min_bb_width
-                and adx > adx_threshold
-                and plus_di > minus_di
-                and rsi >= rsi_long_entry
-            )
+            return df, indicators, None
 
-            short_signal = (
-                ema_50 < ema_200
-                and current_price < vwap # Consider buffer? e.g., current_price < vwap * 0.999
-                and bb_width > min_bb_width
-                and adx > adx_threshold
-                and minus_di > plus_di
-                and rsi <= rsi_short_entry
-            )
+        arrays['valid'] = valid
+        arrays['first_i'] = int(np.argmax(valid)) # First True
+
+        # Optional: Drop intermediate columns from the output
+        # for col in ('plus_di', 'minus_di'): indicators.pop(col)
 
-            # --- Execute Trades ---
-            if position is None: # Only new entries if flat
-                if long_signal:
-                    df.loc[i, 'trade_type'] = TradeType.LONG.value
-                    position = 'LONG'
-                    entry_price = current_price
-                    sl = entry_price - atr * atr_mult_sl
-                    # TSL starts at SL level, will be updated on next bars if price moves favorably
-                    tsl = sl
-                    tp = entry_price + atr * atr_mult_tp
-                    trade_executed_this_bar = True
-                elif short_signal:
-                    df.loc[i, 'trade_type'] = TradeType.SHORT.value
-                    position = 'SHORT'
-                    entry_price = current_price
-                    sl = entry_price + atr * atr_mult_sl
-                    tsl = sl
-                    tp = entry_price - atr * atr_mult_tp
-                    trade_executed_this_bar = True
-
-            elif allow_reversals: # Handle reversals only if allowed
-                if position == 'SHORT' and long_signal:
-                    df.loc[i, 'trade_type'] = TradeType.REVERSE_LONG.value
-                    position = 'LONG'
-                    entry_price = current_price
-                    sl = entry_price - atr * atr_mult_sl
-                    tsl = sl
-                    tp = entry_price + atr * atr_mult_tp
-                    trade_executed_this_bar = True
-                elif position == 'LONG' and short_signal:
-                    df.loc[i, 'trade_type'] = TradeType.REVERSE_SHORT.value
-                    position = 'SHORT'
-                    entry_price = current_price
-                    sl = entry_price + atr * atr_mult_sl
-                    tsl = sl
-                    tp = entry_price - atr * atr_mult_tp
-                    trade_executed_this_bar = True
-
-            # --- Set HOLD if no action ---
-            if not trade_executed_this_bar:
-                 df.loc[i, 'trade_type'] = TradeType.HOLD.value
-
-            # --- Store State ---
-            df.loc[i, 'SL'] = sl
-            df.loc[i, 'TP'] = tp
-            df.loc[i, 'TSL'] = tsl
-
-        # Optional: Clean up intermediate columns
-        # df.drop(columns=['cum_vol_price', 'cum_vol', 'plus_di', 'minus_di'], inplace=True, errors='ignore')
-
-        return df
\ No newline at end of file
+        return df, indicators, arrays
@@ -0,0 +1,24 @@
+"""
+Optional Numba support. Falls back to a no-op decorator so the strategy still runs
+(as plain Python) when numba is not installed.
+"""
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        # Supports both bare `@njit` and `@njit(cache=True, ...)`
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+# Options shared by all kernels. Compiled code is cached on disk so a fresh interpreter
+# skips compilation. fastmath leaves out 'nnan'/'ninf': the kernels use NaN for
+# warm-up bars and empty stops.
+JIT_OPTIONS = dict(
+    cache=True,
+    fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'},
+    boundscheck=False,
+)
@@ -0,0 +1,194 @@
+"""
+Single-pass indicator kernels over float64 NumPy arrays, used in place of pandas_ta.
+Warm-up bars are NaN, as with pandas_ta.
+"""
+import math
+import numpy as np
+
+from _njit import njit, JIT_OPTIONS
+
+
+@njit(**JIT_OPTIONS)
+def ema_pair(x, span_a, span_b):
+    """
+    Two EMAs of x computed in one pass, so each x[i] is loaded once for both. Each is
+    seeded with the SMA of its first `span` values (pandas_ta default).
+    """
+    n = x.shape[0]
+    out_a = np.full(n, np.nan)
+    out_b = np.full(n, np.nan)
+    alpha_a = 2.0 / (span_a + 1.0)
+    alpha_b = 2.0 / (span_b + 1.0)
+    total = 0.0 # Running sum for the SMA seeds
+    s_a = 0.0
+    s_b = 0.0
+    for i in range(n):
+        xi = x[i]
+        if i < span_a or i < span_b:
+            total += xi
+
+        if i == span_a - 1:
+            s_a = total / span_a
+            out_a[i] = s_a
+        elif i >= span_a:
+            s_a += alpha_a * (xi - s_a)
+            out_a[i] = s_a
+
+        if i == span_b - 1:
+            s_b = total / span_b
+            out_b[i] = s_b
+        elif i >= span_b:
+            s_b += alpha_b * (xi - s_b)
+            out_b[i] = s_b
+    return out_a, out_b
+
+
+@njit(**JIT_OPTIONS)
+def rolling_mean_std(x, window):
+    """Rolling mean and population std (ddof=0) via a sliding Welford update."""
+    n = x.shape[0]
+    out_m = np.full(n, np.nan)
+    out_s = np.full(n, np.nan)
+    if n < window:
+        return out_m, out_s
+    mean = 0.0
+    m2 = 0.0
+    for i in range(window):
+        delta = x[i] - mean
+        mean += delta / (i + 1)
+        m2 += delta * (x[i] - mean)
+    out_m[window - 1] = mean
+    out_s[window - 1] = math.sqrt(max(m2 / window, 0.0))
+    for i in range(window, n):
+        x_new = x[i]
+        x_old = x[i - window]
+        old_mean = mean
+        mean += (x_new - x_old) / window
+        m2 += (x_new - x_old) * (x_new - mean + x_old - old_mean)
+        out_m[i] = mean
+        out_s[i] = math.sqrt(max(m2 / window, 0.0))
+    return out_m, out_s
+
+
+@njit(**JIT_OPTIONS)
+def rsi_wilder(close, length):
+    """RSI with Wilder smoothing, seeded with the mean gain/loss of the first `length` changes."""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    if n <= length:
+        return out
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, length + 1):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            avg_gain += d
+        else:
+            avg_loss -= d
+    avg_gain /= length
+    avg_loss /= length
+    if avg_gain + avg_loss > 0:
+        out[length] = 100.0 * avg_gain / (avg_gain + avg_loss)
+    for i in range(length + 1, n):
+        d = close[i] - close[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = (avg_gain * (length - 1) + gain) / length
+        avg_loss = (avg_loss * (length - 1) + loss) / length
+        if avg_gain + avg_loss > 0:
+            out[i] = 100.0 * avg_gain / (avg_gain + avg_loss)
+    return out
+
+
+@njit(**JIT_OPTIONS)
+def _true_range(high, low, close, i):
+    prev_close = close[i - 1]
+    return max(high[i] - low[i], abs(high[i] - prev_close), abs(low[i] - prev_close))
+
+
+@njit(**JIT_OPTIONS)
+def atr_wilder(high, low, close, length):
+    """ATR with Wilder smoothing. The first bar has no true range."""
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    if n <= length:
+        return out
+    atr = 0.0
+    for i in range(1, length + 1):
+        atr += _true_range(high, low, close, i)
+    atr /= length
+    out[length] = atr
+    for i in range(length + 1, n):
+        atr = (atr * (length - 1) + _true_range(high, low, close, i)) / length
+        out[i] = atr
+    return out
+
+
+@njit(**JIT_OPTIONS)
+def adx_wilder(high, low, close, length):
+    """ADX, +DI and -DI using Wilder-smoothed true range and directional movement."""
+    n = close.shape[0]
+    adx = np.full(n, np.nan)
+    pdi = np.full(n, np.nan)
+    mdi = np.full(n, np.nan)
+    if n <= length:
+        return adx, pdi, mdi
+
+    tr_s = 0.0
+    pdm_s = 0.0
+    mdm_s = 0.0
+    dx_sum = 0.0
+    adx_s = 0.0
+    for i in range(1, n):
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        pdm = up if (up > down and up > 0) else 0.0
+        mdm = down if (down > up and down > 0) else 0.0
+        tr = _true_range(high, low, close, i)
+
+        if i <= length:
+            # Seed the smoothed values with plain averages over the first `length` bars
+            tr_s += tr / length
+            pdm_s += pdm / length
+            mdm_s += mdm / length
+            if i < length:
+                continue
+        else:
+            tr_s = (tr_s * (length - 1) + tr) / length
+            pdm_s = (pdm_s * (length - 1) + pdm) / length
+            mdm_s = (mdm_s * (length - 1) + mdm) / length
+
+        p = 100.0 * pdm_s / tr_s if tr_s > 0 else 0.0
+        m = 100.0 * mdm_s / tr_s if tr_s > 0 else 0.0
+        pdi[i] = p
+        mdi[i] = m
+        dx = 100.0 * abs(p - m) / (p + m) if p + m > 0 else 0.0
+
+        # ADX needs `length` DX values before it is seeded
+        k = i - length + 1
+        if k < length:
+            dx_sum += dx
+        elif k == length:
+            adx_s = (dx_sum + dx) / length
+            adx[i] = adx_s
+        else:
+            adx_s = (adx_s * (length - 1) + dx) / length
+            adx[i] = adx_s
+    return adx, pdi, mdi
+
+
+@njit(**JIT_OPTIONS)
+def vwap_running(close, volume):
+    """Cumulative VWAP in one pass; carries the last value forward while volume is zero."""
+    n = close.shape[0]
+    out = np.empty(n)
+    num = 0.0
+    den = 0.0
+    prev = np.nan
+    for i in range(n):
+        num += close[i] * volume[i]
+        den += volume[i]
+        if den > 0:
+            prev = num / den
+        out[i] = prev
+    return out